@@ -0,0 +1,47 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Optional numba compilation for hot loops."""
+
+from typing import Any, Callable, TypeVar
+
+try:
+  import numba
+except ImportError:
+  numba = None
+
+AVAILABLE = numba is not None
+
+_F = TypeVar('_F', bound=Callable[..., Any])
+
+
+def njit(signature: str, **kwargs: Any) -> Callable[[_F], _F]:
+  """Compiles a function with numba for a single signature.
+
+  An explicit signature compiles eagerly at import, so the first call does
+  not pay the JIT cost. Without numba the function is returned unchanged.
+
+  Args:
+    signature: numba signature string, e.g. `'float64(int64[::1])'`.
+    **kwargs: Extra options for `numba.njit`.
+
+  Returns:
+    Decorator compiling the function.
+  """
+  def decorator(func: _F) -> _F:
+    if numba is None:
+      return func
+    return numba.njit(signature, cache=True, **kwargs)(func)
+
+  return decorator
@@ -14,25 +14,61 @@
 
 """Common data types."""
 
-from typing import Sequence
+import array
+import itertools
+import operator
+from typing import Any, Dict, List, Sequence, Tuple, Union
 
 import dataclasses
-import dataclasses_json
 
-@dataclasses_json.dataclass_json
-@dataclasses.dataclass
+import numpy as np
+
+_UINT32_MAX = np.iinfo(np.uint32).max
+_FREE_FRAGMENTS_ERROR = 'Free fragment counts must be integers in [0, 2**32)'
+
+
+def _check_free_fragments(free_fragments: Any, context: str) -> np.ndarray:
+  """Returns `free_fragments` as an array after checking it fits in uint32.
+
+  Checked before any cast to uint32, which wraps or raises depending on the
+  input type.
+  """
+  free_fragments = np.asarray(free_fragments)
+  if free_fragments.size and (free_fragments.min() < 0 or
+                              free_fragments.max() > _UINT32_MAX):
+    raise ValueError(
+        f'{_FREE_FRAGMENTS_ERROR}, got {free_fragments.tolist()} for '
+        f'{context}')
+  return free_fragments
+
+
+@dataclasses.dataclass(slots=True)
 class Zone:
   """Zone from /proc/buddyinfo.
 
   Attributes:
-    free_fragments: Free memory segments by order.
+    free_fragments: Free memory segments by order. Either a sequence of ints
+      or a packed integer buffer such as `np.ndarray` or `array.array`.
+      Counts must fit in uint32 to be converted to a `BuddyInfoTable`.
   """
   zone_type: str
-  free_fragments: Sequence[int]
+  free_fragments: Union[Sequence[int], np.ndarray, array.array, memoryview]
 
+  def to_dict(self) -> Dict[str, Any]:
+    """Returns a JSON-serializable dict."""
+    # Packed buffers (`np.ndarray`, `array.array`, `memoryview`) unpack to
+    # Python ints in C with `tolist`.
+    if isinstance(self.free_fragments, (np.ndarray, array.array, memoryview)):
+      free_fragments = self.free_fragments.tolist()
+    else:
+      free_fragments = list(self.free_fragments)
+    return {
+        'zone_type': self.zone_type,
+        'free_fragments': free_fragments,
+    }
 
-@dataclasses_json.dataclass_json
-@dataclasses.dataclass
+
+@dataclasses.dataclass(slots=True)
 class NumaNode:
   """NUMA node from /proc/buddyinfo.
 
@@ -42,9 +78,15 @@ class NumaNode:
   node_index: int
   zones: Sequence[Zone]
 
+  def to_dict(self) -> Dict[str, Any]:
+    """Returns a JSON-serializable dict."""
+    return {
+        'node_index': self.node_index,
+        'zones': [zone.to_dict() for zone in self.zones],
+    }
+
 
-@dataclasses_json.dataclass_json
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class BuddyInfoData:
   """Structured contents of `/proc/buddyinfo` pseudo file.
 
@@ -55,9 +97,118 @@ class BuddyInfoData:
   timestamp: int
   numa_nodes: Sequence[NumaNode]
 
+  def to_dict(self) -> Dict[str, Any]:
+    """Returns a JSON-serializable dict."""
+    return {
+        'timestamp': self.timestamp,
+        'numa_nodes': [node.to_dict() for node in self.numa_nodes],
+    }
+
+
+@dataclasses.dataclass(slots=True)
+class BuddyInfoTable:
+  """Column-oriented contents of `/proc/buddyinfo`, one row per zone.
+
+  Attributes:
+    timestamp: Timestamp in seconds from epoch.
+    node_index: NUMA node index of each zone, shape (zones,).
+    zone_type: Zone type of each zone.
+    num_orders: Number of orders of each zone, shape (zones,).
+    free_fragments: Free memory segments by order, zero-padded past each
+      zone's number of orders, shape (zones, max_orders). Stored as uint32,
+      which holds the free block count of any order in zones of up to
+      16 TiB, to halve the memory traffic of the fragmentation batch.
+  """
+  timestamp: int
+  node_index: np.ndarray
+  zone_type: List[str]
+  num_orders: np.ndarray
+  free_fragments: np.ndarray
+
+  def __post_init__(self) -> None:
+    # The numba kernels only take these dtypes, so coerce hand-built tables
+    # here instead of letting results depend on whether numba is installed.
+    if not (isinstance(self.free_fragments, np.ndarray) and
+            self.free_fragments.dtype == np.uint32):
+      self.free_fragments = _check_free_fragments(self.free_fragments, 'table')
+    self.free_fragments = np.ascontiguousarray(self.free_fragments,
+                                               dtype=np.uint32)
+    self.node_index = np.ascontiguousarray(self.node_index, dtype=np.int64)
+    self.num_orders = np.ascontiguousarray(self.num_orders, dtype=np.int64)
+
+  @classmethod
+  def from_rows(
+      cls,
+      timestamp: int,
+      rows: Sequence[Tuple[int, str, Sequence[int]]],
+  ) -> 'BuddyInfoTable':
+    """Builds a table from (node index, zone type, free fragments) rows.
+
+    Raises:
+      ValueError: If a free fragment count does not fit in uint32.
+    """
+    num_orders = np.array([len(row[2]) for row in rows], dtype=np.int64)
+    free_fragments = np.zeros((len(rows), num_orders.max(initial=0)),
+                              dtype=np.uint32)
+    for i, row in enumerate(rows):
+      free_fragments[i, :num_orders[i]] = _check_free_fragments(
+          row[2], f'node {row[0]} zone {row[1]}')
+    return cls(
+        timestamp=timestamp,
+        node_index=np.array([row[0] for row in rows], dtype=np.int64),
+        zone_type=[row[1] for row in rows],
+        num_orders=num_orders,
+        free_fragments=free_fragments)
+
+  @classmethod
+  def from_buddy_info_data(cls, data: BuddyInfoData) -> 'BuddyInfoTable':
+    return cls.from_rows(
+        data.timestamp,
+        [(node.node_index, zone.zone_type, zone.free_fragments)
+         for node in data.numa_nodes for zone in node.zones])
+
+  def _group_by_node(self, zones: Sequence[Any]) -> List[Tuple[int, List[Any]]]:
+    """Groups one item per row into (node index, items) pairs."""
+    # /proc/buddyinfo lists all zones of a node before moving to the next.
+    return [
+        (node_index, [zone for _, zone in group])
+        for node_index, group in itertools.groupby(
+            zip(self.node_index.tolist(), zones), key=operator.itemgetter(0))
+    ]
+
+  def to_buddy_info_data(self) -> BuddyInfoData:
+    """Returns the nested `BuddyInfoData` view of this table.
+
+    Zone free fragments are views into `free_fragments`, not copies.
+    """
+    zones = [
+        Zone(zone_type=zone_type, free_fragments=self.free_fragments[i, :n])
+        for i, (zone_type, n) in enumerate(
+            zip(self.zone_type, self.num_orders.tolist()))
+    ]
+    return BuddyInfoData(
+        timestamp=self.timestamp,
+        numa_nodes=[NumaNode(node_index=node_index, zones=node_zones)
+                    for node_index, node_zones in self._group_by_node(zones)])
+
+  def to_dict(self) -> Dict[str, Any]:
+    """Returns the same JSON-serializable dict as `BuddyInfoData.to_dict`."""
+    zones = [
+        {'zone_type': zone_type, 'free_fragments': free_fragments[:n]}
+        for zone_type, n, free_fragments in zip(
+            self.zone_type, self.num_orders.tolist(),
+            self.free_fragments.tolist())
+    ]
+    return {
+        'timestamp': self.timestamp,
+        'numa_nodes': [
+            {'node_index': node_index, 'zones': node_zones}
+            for node_index, node_zones in self._group_by_node(zones)
+        ],
+    }
+
 
-@dataclasses_json.dataclass_json
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class MemoryFragmentation:
   """Memory fragmentation data for a particular NUMA node/zone.
 
@@ -72,3 +223,11 @@ class MemoryFragmentation:
   zone_type: str
   percentage: float
 
+  def to_dict(self) -> Dict[str, Any]:
+    """Returns a JSON-serializable dict."""
+    return {
+        'timestamp': self.timestamp,
+        'node_index': self.node_index,
+        'zone_type': self.zone_type,
+        'percentage': self.percentage,
+    }
@@ -0,0 +1,148 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for data_types module."""
+
+import array
+import unittest
+
+import numpy as np
+
+from memutil import data_types
+
+
+class BuddyInfoDataTest(unittest.TestCase):
+  """Tests for `BuddyInfoData` class."""
+
+  def test_to_dict(self):
+    data = data_types.BuddyInfoData(
+        timestamp=1,
+        numa_nodes=[
+            data_types.NumaNode(
+                node_index=0,
+                zones=[
+                    data_types.Zone(zone_type='DMA',
+                                    free_fragments=(0, 1, 2)),
+                ]),
+        ])
+    expected = {
+        'timestamp': 1,
+        'numa_nodes': [{
+            'node_index': 0,
+            'zones': [{'zone_type': 'DMA', 'free_fragments': [0, 1, 2]}],
+        }],
+    }
+    self.assertEqual(expected, data.to_dict())
+
+  def test_to_dict_with_array(self):
+    zone = data_types.Zone(zone_type='DMA',
+                           free_fragments=np.array([0, 1, 2], dtype=np.int64))
+    free_fragments = zone.to_dict()['free_fragments']
+    self.assertEqual([0, 1, 2], free_fragments)
+    self.assertIsInstance(free_fragments[0], int)
+
+  def test_to_dict_with_packed_buffer(self):
+    packed = array.array('q', [0, 1, 2])
+    for free_fragments in [packed, memoryview(packed)]:
+      zone = data_types.Zone(zone_type='DMA', free_fragments=free_fragments)
+      self.assertEqual([0, 1, 2], zone.to_dict()['free_fragments'])
+
+
+class BuddyInfoTableTest(unittest.TestCase):
+  """Tests for `BuddyInfoTable` class."""
+
+  def setUp(self) -> None:
+    self._table = data_types.BuddyInfoTable.from_rows(
+        timestamp=1,
+        rows=[(0, 'DMA', [1, 2, 3]), (0, 'Normal', [4, 5]),
+              (1, 'Normal', [6, 7, 8])])
+
+  def test_from_rows_pads_free_fragments(self):
+    self.assertEqual([3, 2, 3], self._table.num_orders.tolist())
+    self.assertEqual([[1, 2, 3], [4, 5, 0], [6, 7, 8]],
+                     self._table.free_fragments.tolist())
+
+  def test_from_rows_rejects_out_of_range(self):
+    for free_fragments in [[2**32 + 5, 2], [-1, 2],
+                           np.array([2**32 + 5, 2], dtype=np.int64),
+                           np.array([-1, 2], dtype=np.int64)]:
+      with self.assertRaises(ValueError):
+        data_types.BuddyInfoTable.from_rows(
+            timestamp=1, rows=[(0, 'Normal', free_fragments)])
+
+  def test_init_coerces_dtypes(self):
+    table = data_types.BuddyInfoTable(
+        timestamp=1,
+        node_index=np.array([0], dtype=np.int32),
+        zone_type=['Normal'],
+        num_orders=np.array([3], dtype=np.int32),
+        free_fragments=np.array([[1, 2, 3]], dtype=np.int64))
+    self.assertEqual(np.int64, table.node_index.dtype)
+    self.assertEqual(np.int64, table.num_orders.dtype)
+    self.assertEqual(np.uint32, table.free_fragments.dtype)
+    self.assertTrue(table.free_fragments.flags.c_contiguous)
+
+  def test_init_rejects_out_of_range(self):
+    for free_fragments in [np.array([[2**32 + 5, 2]], dtype=np.int64),
+                           np.array([[-1, 2]], dtype=np.int64)]:
+      with self.assertRaises(ValueError):
+        data_types.BuddyInfoTable(
+            timestamp=1,
+            node_index=np.array([0]),
+            zone_type=['Normal'],
+            num_orders=np.array([2]),
+            free_fragments=free_fragments)
+
+  def test_from_rows_accepts_uint32_max(self):
+    table = data_types.BuddyInfoTable.from_rows(
+        timestamp=1, rows=[(0, 'Normal', [2**32 - 1, 0])])
+    self.assertEqual([[2**32 - 1, 0]], table.free_fragments.tolist())
+
+  def test_to_buddy_info_data_groups_zones_by_node(self):
+    data = self._table.to_buddy_info_data()
+    self.assertEqual([0, 1], [node.node_index for node in data.numa_nodes])
+    self.assertEqual(['DMA', 'Normal'],
+                     [zone.zone_type for zone in data.numa_nodes[0].zones])
+    self.assertEqual([4, 5],
+                     data.numa_nodes[0].zones[1].free_fragments.tolist())
+
+  def test_round_trip(self):
+    data = self._table.to_buddy_info_data()
+    table = data_types.BuddyInfoTable.from_buddy_info_data(data)
+    self.assertEqual(self._table.free_fragments.tolist(),
+                     table.free_fragments.tolist())
+    self.assertEqual(data.to_dict(), table.to_dict())
+
+
+class MemoryFragmentationTest(unittest.TestCase):
+  """Tests for `MemoryFragmentation` class."""
+
+  def test_slots(self):
+    fragmentation = data_types.MemoryFragmentation(
+        timestamp=1, node_index=0, zone_type='Normal', percentage=25.0)
+    self.assertFalse(hasattr(fragmentation, '__dict__'))
+
+  def test_to_dict(self):
+    fragmentation = data_types.MemoryFragmentation(
+        timestamp=1, node_index=0, zone_type='Normal', percentage=25.0)
+    expected = {
+        'timestamp': 1,
+        'node_index': 0,
+        'zone_type': 'Normal',
+        'percentage': 25.0,
+    }
+    self.assertEqual(expected, fragmentation.to_dict())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -18,45 +18,85 @@ Implementation inspired by:
 - https://github.com/bittorf/calculate-linux-memory-fragmentation
 """
 
-from typing import Sequence
+from typing import Sequence, Union
 
+import numpy as np
+
+from memutil import _jit
 from memutil import data_types
 
+# Orders 0..63, sliced per batch instead of rebuilt. Pages shifted by 64 or
+# more orders would not fit in int64 anyway.
+_ORDERS = np.arange(64, dtype=np.int64)
+
+
+def _fragmentation_percentages_numpy(
+    free_fragments: np.ndarray, num_orders: np.ndarray) -> np.ndarray:
+  """Computes memory fragmentation percentages for a batch of zones.
+
+  The free percentage at order i is `100 * sum(pages[:i]) / pages_total`,
+  so averaging it over all n orders reduces to a single weighted sum where
+  pages at order i are counted once for each of the n - 1 - i higher orders.
+  Padded orders hold no pages, so they do not contribute to either sum.
+
+  Args:
+    free_fragments: Free fragments by order as uint32, shape
+      (zones, max_orders), zero-padded past each zone's number of orders.
+    num_orders: Number of orders for each zone, shape (zones,).
 
-def _compute_memory_fragmentation_percentage(zone: data_types.Zone):
-  """Computes memory fragmentation percentage for a zone."""
-  pages_list = []
-  multiplier = 1
-  for fragments in zone.free_fragments:
-    pages_list.append(fragments * multiplier)
-    multiplier *= 2
+  Returns:
+    Fragmentation percentage for each zone, shape (zones,).
+  """
+  orders = _ORDERS[:free_fragments.shape[1]]
+  # Page counts can overflow 32 bits, so widen while shifting.
+  pages = np.left_shift(free_fragments, orders, dtype=np.int64)
+  pages_total = pages.sum(axis=1)
+  weights = num_orders[:, np.newaxis] - 1 - orders
+  weighted_pages_total = (pages * weights).sum(axis=1)
+  denominator = num_orders * pages_total
+  return np.divide(100.0 * weighted_pages_total, denominator,
+                   out=np.zeros(len(denominator)), where=denominator > 0)
 
-  pages_total = sum(pages_list)
-  percent_free_total = 0
-  running_pages_total = 0
-  for pages in pages_list:
-    residual_pages = pages_total - running_pages_total
-    running_pages_total += pages
-    percent_free = 100 - (residual_pages * 100) / pages_total
-    percent_free_total += percent_free
 
-  zone_percent_free = percent_free_total / len(pages_list)
-  return zone_percent_free
+@_jit.njit('float64[::1](uint32[:, ::1], int64[::1])', fastmath=True)
+def _fragmentation_percentages_numba(
+    free_fragments: np.ndarray, num_orders: np.ndarray) -> np.ndarray:
+  """Loop equivalent of `_fragmentation_percentages_numpy` for numba."""
+  percentages = np.zeros(free_fragments.shape[0])
+  for row in range(free_fragments.shape[0]):
+    n = num_orders[row]
+    pages_total = 0
+    weighted_pages_total = 0
+    for order in range(n):
+      pages = np.int64(free_fragments[row, order]) << order
+      pages_total += pages
+      weighted_pages_total += (n - 1 - order) * pages
+    if pages_total:
+      percentages[row] = 100.0 * weighted_pages_total / (n * pages_total)
+  return percentages
+
+
+if _jit.AVAILABLE:
+  _fragmentation_percentages = _fragmentation_percentages_numba
+else:
+  _fragmentation_percentages = _fragmentation_percentages_numpy
 
 
 def compute_memory_fragmentation_percentages(
-    data: data_types.BuddyInfoData,
+    data: Union[data_types.BuddyInfoData, data_types.BuddyInfoTable],
 ) -> Sequence[data_types.MemoryFragmentation]:
   """Computes memory fragmentation percentages for each node/zone."""
-  output = []
-  for node in data.numa_nodes:
-    for zone in node.zones:
-      percentage = _compute_memory_fragmentation_percentage(zone)
-      output.append(data_types.MemoryFragmentation(
-          timestamp=data.timestamp,
-          node_index=node.node_index,
-          zone_type=zone.zone_type,
-          percentage=percentage))
-
-  return output
+  if isinstance(data, data_types.BuddyInfoData):
+    data = data_types.BuddyInfoTable.from_buddy_info_data(data)
 
+  percentages = _fragmentation_percentages(data.free_fragments,
+                                           data.num_orders)
+  return [
+      data_types.MemoryFragmentation(
+          timestamp=data.timestamp,
+          node_index=node_index,
+          zone_type=zone_type,
+          percentage=percentage)
+      for node_index, zone_type, percentage in zip(
+          data.node_index.tolist(), data.zone_type, percentages.tolist())
+  ]
@@ -13,9 +13,13 @@
 # limitations under the License.
 """Tests for fragmentation module."""
 
+import array
 import time
 import unittest
 
+import numpy as np
+
+from memutil import _jit
 from memutil import data_types
 from memutil import fragmentation
 
@@ -90,6 +94,97 @@ class ComputeMemoryFragmentationPercentagesTest(unittest.TestCase):
     for e, o in zip(expected, output):
       self._assert_memory_fragmentation_almost_equal(e, o)
 
+  def test_buddy_info_table_ok(self):
+    data = _get_sample_buddy_info_data(timestamp=0)
+    expected = fragmentation.compute_memory_fragmentation_percentages(data)
+    output = fragmentation.compute_memory_fragmentation_percentages(
+        data_types.BuddyInfoTable.from_buddy_info_data(data))
+    self.assertEqual(len(expected), len(output))
+    for e, o in zip(expected, output):
+      self._assert_memory_fragmentation_almost_equal(e, o)
+
+  def test_hand_built_table_ok(self):
+    table = data_types.BuddyInfoTable(
+        timestamp=0,
+        node_index=np.array([0], dtype=np.int64),
+        zone_type=['Normal'],
+        num_orders=np.array([3], dtype=np.int32),
+        free_fragments=np.array([[1, 2, 3]], dtype=np.int64))
+    output = fragmentation.compute_memory_fragmentation_percentages(table)
+    self.assertAlmostEqual(100 * (1 * 2 + 4 * 1) / (3 * 17),
+                           output[0].percentage)
+    implementations = [fragmentation._fragmentation_percentages_numpy]
+    if _jit.AVAILABLE:
+      implementations.append(fragmentation._fragmentation_percentages_numba)
+    for implementation in implementations:
+      self.assertAlmostEqual(
+          output[0].percentage,
+          implementation(table.free_fragments, table.num_orders)[0])
+
+  def test_large_free_fragments_ok(self):
+    data = data_types.BuddyInfoTable.from_rows(
+        timestamp=0, rows=[(0, 'Normal', [2**32 - 1] + [0] * 9 + [2**32 - 1])])
+    output = fragmentation.compute_memory_fragmentation_percentages(data)
+    self.assertAlmostEqual(100 * 10 / (11 * 1025), output[0].percentage)
+
+  def test_packed_free_fragments_ok(self):
+    data = _get_sample_buddy_info_data(timestamp=0)
+    expected = fragmentation.compute_memory_fragmentation_percentages(data)
+    for node in data.numa_nodes:
+      for zone in node.zones:
+        zone.free_fragments = array.array('q', zone.free_fragments)
+    output = fragmentation.compute_memory_fragmentation_percentages(data)
+    for e, o in zip(expected, output):
+      self._assert_memory_fragmentation_almost_equal(e, o)
+
+  def test_packed_free_fragments_out_of_range(self):
+    for free_fragments in [array.array('q', [2**33 + 5, 1]),
+                           array.array('q', [-1, 1]),
+                           memoryview(array.array('q', [-1, 1]))]:
+      data = data_types.BuddyInfoData(
+          timestamp=0,
+          numa_nodes=[
+              data_types.NumaNode(
+                  node_index=0,
+                  zones=[data_types.Zone(zone_type='Normal',
+                                         free_fragments=free_fragments)]),
+          ])
+      with self.assertRaises(ValueError):
+        fragmentation.compute_memory_fragmentation_percentages(data)
+
+  def test_no_free_pages_ok(self):
+    data = data_types.BuddyInfoData(
+        timestamp=0,
+        numa_nodes=[
+            data_types.NumaNode(
+                node_index=0,
+                zones=[data_types.Zone(zone_type='Normal',
+                                       free_fragments=[0] * 11)]),
+        ])
+    output = fragmentation.compute_memory_fragmentation_percentages(data)
+    self.assertEqual(1, len(output))
+    self.assertEqual(0.0, output[0].percentage)
+
+
+@unittest.skipUnless(_jit.AVAILABLE, 'numba is not installed')
+class FragmentationPercentagesNumbaTest(unittest.TestCase):
+  """Tests for the compiled `_fragmentation_percentages_numba`."""
+
+  def test_matches_numpy_implementation(self):
+    free_fragments = np.array(
+        [[2276, 2354, 2313, 2467, 2193, 1962, 1605, 1083, 491, 157, 159],
+         [0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 2],
+         [3, 1, 4, 1, 5, 0, 0, 0, 0, 0, 0],
+         [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+         [2**32 - 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 2**32 - 1]],
+        dtype=np.uint32)
+    num_orders = np.array([11, 11, 5, 11, 11], dtype=np.int64)
+    np.testing.assert_allclose(
+        fragmentation._fragmentation_percentages_numpy(
+            free_fragments, num_orders),
+        fragmentation._fragmentation_percentages_numba(
+            free_fragments, num_orders))
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -15,37 +15,143 @@
 """Tools for logging physical memory metrics."""
 
 import abc
-import csv
+from concurrent import futures
 from datetime import datetime
+import os
 import pathlib
-import re
 import time
-from typing import Dict, Optional, Sequence
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
+import orjson
 import psutil
 
+from memutil import _jit
 from memutil import data_types
 
 
 NumaNode = data_types.NumaNode
 Zone = data_types.Zone
 BuddyInfoData = data_types.BuddyInfoData
+BuddyInfoTable = data_types.BuddyInfoTable
+
+# Output files buffer this many bytes of snapshots before each write call.
+_WRITE_BUFFER_SIZE = 64 * 1024
+
+# Large enough to read a whole `/proc` pseudo file in a single `read` call.
+_PROC_READ_SIZE = 64 * 1024
 
 
 def _get_timestring() -> str:
   return datetime.now().strftime('%Y-%m-%d-%H-%M-%S')
 
 
+def _pread_proc_file(fd: int) -> bytes:
+  """Reads a `/proc` pseudo file from the start in one `pread` call."""
+  return os.pread(fd, _PROC_READ_SIZE, 0)
+
+
+@_jit.njit('Tuple((int64[::1], int64[:, ::1], int64[::1], uint32[:, ::1]))'
+           '(Array(uint8, 1, "C", readonly=True))')
+def _scan_buddy_info(
+    buf: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+  """Scans `/proc/buddyinfo` contents without creating Python objects.
+
+  Each line is `Node N, zone NAME f0 f1 ...`; whitespace separated tokens
+  are numbered from 0 and numeric tokens are accumulated digit by digit.
+
+  Args:
+    buf: Raw contents of `/proc/buddyinfo` as uint8.
+
+  Returns:
+    Tuple of NUMA node index per zone, shape (zones,); [start, end) offsets
+    of each zone name in `buf`, shape (zones, 2); number of orders per
+    zone, shape (zones,); and zero-padded free fragments by order, shape
+    (zones, max_orders).
+  """
+  # First pass: count lines and the largest number of tokens on a line.
+  num_zones = 0
+  max_tokens = 0
+  tokens = 0
+  in_token = False
+  for i in range(len(buf)):
+    c = buf[i]
+    if c == 10:  # '\n'
+      if tokens:
+        num_zones += 1
+        max_tokens = max(max_tokens, tokens)
+      tokens = 0
+      in_token = False
+    elif c == 32 or c == 9:  # ' ' or '\t'
+      in_token = False
+    elif not in_token:
+      in_token = True
+      tokens += 1
+  if tokens:
+    num_zones += 1
+    max_tokens = max(max_tokens, tokens)
+
+  node_index = np.zeros(num_zones, dtype=np.int64)
+  zone_spans = np.zeros((num_zones, 2), dtype=np.int64)
+  num_orders = np.zeros(num_zones, dtype=np.int64)
+  free_fragments = np.zeros((num_zones, max(max_tokens - 4, 0)),
+                            dtype=np.uint32)
+
+  # Second pass: fill in the fields.
+  row = 0
+  token = -1
+  in_token = False
+  for i in range(len(buf)):
+    c = buf[i]
+    if c == 10 or c == 32 or c == 9:
+      if in_token and token == 3:
+        zone_spans[row, 1] = i
+      in_token = False
+      if c == 10 and token >= 0:
+        num_orders[row] = max(token - 3, 0)
+        row += 1
+        token = -1
+      continue
+    if not in_token:
+      in_token = True
+      token += 1
+      if token == 3:
+        zone_spans[row, 0] = i
+    is_digit = 48 <= c <= 57  # '0' to '9'
+    if token == 1 and is_digit:
+      node_index[row] = node_index[row] * 10 + (c - 48)
+    elif token >= 4:
+      # Reject what `BuddyInfoTable.from_rows` rejects instead of wrapping.
+      if not is_digit:
+        raise ValueError(data_types._FREE_FRAGMENTS_ERROR)
+      value = np.int64(free_fragments[row, token - 4]) * 10 + (c - 48)
+      if value > data_types._UINT32_MAX:
+        raise ValueError(data_types._FREE_FRAGMENTS_ERROR)
+      free_fragments[row, token - 4] = value
+  if token >= 0:
+    if in_token and token == 3:
+      zone_spans[row, 1] = len(buf)
+    num_orders[row] = max(token - 3, 0)
+
+  return node_index, zone_spans, num_orders, free_fragments
+
+
 class BaseLogger(abc.ABC):
   """Base class for memory loggers."""
 
   @abc.abstractmethod
-  def __init__(self, output_dir: str, label: Optional[str] = None) -> None:
+  def __init__(self,
+               output_dir: str,
+               label: Optional[str] = None,
+               timestring: Optional[str] = None) -> None:
     """Initialize.
 
     Args:
         output_dir: Output directory to store log file.
         label: Label string to include in the log file name.
+        timestring: Time string to include in the log file name. Defaults to
+          the current time.
     """
 
   @abc.abstractmethod
@@ -68,70 +174,96 @@ class BuddyInfoLogger(BaseLogger):
   """
 
   _BUDDY_INFO_PSEUDO_FILE = '/proc/buddyinfo'
-  _BUDDY_INFO_LINE_REGEX = re.compile(
-      r'Node\s+(?P<numa_node>\d+).*zone\s+(?P<zone>\w+)\s+(?P<nr_free>.*)')
   _OUTPUT_SUFFIX = '.jsonl'
   _OUTPUT_PREFIX = 'proc-buddyinfo-log'
 
-  def __init__(self, output_dir: str, label: Optional[str] = None) -> None:
+  def __init__(self,
+               output_dir: str,
+               label: Optional[str] = None,
+               timestring: Optional[str] = None) -> None:
     """Initialize."""
     output_basename = self._OUTPUT_PREFIX
     if label:
       output_basename += f'-{label}'
-    timestring = _get_timestring()
+    if timestring is None:
+      timestring = _get_timestring()
     output_basename += f'-{timestring}'
     self._output_path = (pathlib.Path(output_dir) /
                          output_basename).with_suffix(self._OUTPUT_SUFFIX)
     self._start_time = 0
     self._output_file_object = None
+    self._buddy_info_fd = None
     self._snapshot_count = 0
 
-  def _parse_line(self, line: str) -> Dict[str, str]:
-    line = line.strip()
-    tokens = re.match(self._BUDDY_INFO_LINE_REGEX, line).groupdict()
-    return tokens
+  @staticmethod
+  def _parse_line(line: bytes) -> Tuple[int, str, List[int]]:
+    """Splits a `Node N, zone NAME f0 f1 ...` line into its fields."""
+    parts = line.split()
+    return (int(parts[1].rstrip(b',')), parts[3].decode('ascii'),
+            list(map(int, parts[4:])))
 
   @staticmethod
-  def _parse_tokens(
-      tokens: Dict[str, str],
-      numa_nodes: Dict[int, NumaNode],
-  ) -> None:
-    numa_node_index = tokens['numa_node']
-    zone_type = tokens['zone']
-    free_fragments = [int(x) for x in tokens["nr_free"].split()]
-    zone = Zone(zone_type=zone_type, free_fragments=free_fragments)
-    if numa_node_index in numa_nodes:
-      numa_node = numa_nodes[numa_node_index]
-      numa_node.zones.append(zone)
-    else:
-      numa_node = NumaNode(node_index=numa_node_index, zones=[zone])
-      numa_nodes[numa_node_index] = numa_node
+  def _scan_buffer(buf: bytes, timestamp: int) -> BuddyInfoTable:
+    """Parses `/proc/buddyinfo` contents with `_scan_buddy_info`."""
+    node_index, zone_spans, num_orders, free_fragments = _scan_buddy_info(
+        np.frombuffer(buf, dtype=np.uint8))
+    return BuddyInfoTable(
+        timestamp=timestamp,
+        node_index=node_index,
+        zone_type=[buf[start:end].decode('ascii')
+                   for start, end in zone_spans.tolist()],
+        num_orders=num_orders,
+        free_fragments=free_fragments)
 
-  def read_buddy_info(self) -> BuddyInfoData:
+  @staticmethod
+  def _split_buffer(buf: bytes, timestamp: int) -> BuddyInfoTable:
+    """Parses `/proc/buddyinfo` contents line by line."""
+    return BuddyInfoTable.from_rows(
+        timestamp,
+        [BuddyInfoLogger._parse_line(line)
+         for line in buf.split(b'\n') if line])
+
+  def _read_buddy_info_bytes(self) -> bytes:
+    if self._buddy_info_fd is not None:
+      return _pread_proc_file(self._buddy_info_fd)
+
+    fd = os.open(self._BUDDY_INFO_PSEUDO_FILE, os.O_RDONLY)
+    try:
+      return _pread_proc_file(fd)
+    finally:
+      os.close(fd)
+
+  def read_buddy_info_table(self) -> BuddyInfoTable:
     timestamp = int(time.time())
-    numa_nodes = {}
-    with open(self._BUDDY_INFO_PSEUDO_FILE) as fp:
-      for line in fp:
-        tokens = self._parse_line(line)
-        self._parse_tokens(tokens, numa_nodes)
+    buf = self._read_buddy_info_bytes()
+    if _jit.AVAILABLE:
+      return self._scan_buffer(buf, timestamp)
+    return self._split_buffer(buf, timestamp)
 
-    return BuddyInfoData(
-        timestamp=timestamp, numa_nodes=numa_nodes.values())
+  def read_buddy_info(self) -> BuddyInfoData:
+    return self.read_buddy_info_table().to_buddy_info_data()
 
   def snapshot(self) -> None:
     assert self._output_file_object is not None
     self._snapshot_count += 1
-    data = self.read_buddy_info()
-    self._output_file_object.write(data.to_json() + '\n')
+    data = self.read_buddy_info_table()
+    self._output_file_object.write(
+        orjson.dumps(data.to_dict(), option=orjson.OPT_APPEND_NEWLINE))
 
   def __enter__(self):
-    self._output_file_object = self._output_path.open('wt')
+    self._output_file_object = self._output_path.open(
+        'wb', buffering=_WRITE_BUFFER_SIZE)
+    # Keep the pseudo file open so each snapshot is a single `pread`.
+    self._buddy_info_fd = os.open(self._BUDDY_INFO_PSEUDO_FILE, os.O_RDONLY)
     self._start_time = time.time()
     return self
 
   def __exit__(self, exc_type, exc_value, exc_tb):
     if self._output_file_object:
       self._output_file_object.close()
+    if self._buddy_info_fd is not None:
+      os.close(self._buddy_info_fd)
+      self._buddy_info_fd = None
     self._snapshot_count = 0
 
   @property
@@ -144,9 +276,26 @@ class PsUtilLogger(BaseLogger):
 
   Note: Some metrics collected are only available on Linux.
   See https://psutil.readthedocs.io/en/latest/#system-related-functions
-  for more info.
+  for more info. Virtual memory metrics are read from `/proc/meminfo`
+  directly and follow the definitions of `psutil.virtual_memory()` in the
+  pinned psutil 5.9.5: `used` is `total - free - cached - buffers`, and
+  `percent` is the share of `total` that is not `available`.
   """
 
+  _MEMINFO_PSEUDO_FILE = '/proc/meminfo'
+  _MEMINFO_FIELDS = frozenset([
+      b'MemTotal:',
+      b'MemFree:',
+      b'MemAvailable:',
+      b'Buffers:',
+      b'Cached:',
+      b'Active:',
+      b'Inactive:',
+      b'Shmem:',
+      b'SReclaimable:',
+      b'Slab:',
+  ])
+
   _CSV_HEADER = [
       # Process memory metrics
       'rss',
@@ -177,8 +326,12 @@ class PsUtilLogger(BaseLogger):
 
   BYTES_TO_GIB = 1024 * 1024 * 1024
 
-  def __init__(self, output_dir: str, label: Optional[str] = None):
-    timestring = _get_timestring()
+  def __init__(self,
+               output_dir: str,
+               label: Optional[str] = None,
+               timestring: Optional[str] = None):
+    if timestring is None:
+      timestring = _get_timestring()
     csv_basename  = self._OUTPUT_PREFIX
     if label:
       csv_basename += f'-{label}'
@@ -191,57 +344,77 @@ class PsUtilLogger(BaseLogger):
     self._start_time = 0
     self._snapshot_count = 0
     self._throughput = 0
+    self._output_file_object = None
+    self._meminfo_fd = None
+    self._process = None
 
   def __enter__(self):
-    self._output_file_object = self._output_path.open('wt')
-    self._csv_writer = csv.writer(self._output_file_object)
-    self._csv_writer.writerow(self._CSV_HEADER)
+    self._output_file_object = self._output_path.open(
+        'wb', buffering=_WRITE_BUFFER_SIZE)
+    self._output_file_object.write(
+        ','.join(self._CSV_HEADER).encode() + b'\n')
+    self._meminfo_fd = os.open(self._MEMINFO_PSEUDO_FILE, os.O_RDONLY)
+    self._process = psutil.Process()
     self._start_time = time.time()
     return self
 
   def __exit__(self, exc_type, exc_value, exc_tb):
     if self._output_file_object:
       self._output_file_object.close()
+    if self._meminfo_fd is not None:
+      os.close(self._meminfo_fd)
+      self._meminfo_fd = None
     self._snapshot_count = 0
 
+  def _read_meminfo(self) -> Dict[bytes, int]:
+    """Returns the `/proc/meminfo` fields in use, in bytes."""
+    buf = _pread_proc_file(self._meminfo_fd)
+    meminfo = {}
+    for line in buf.split(b'\n'):
+      parts = line.split()
+      if parts and parts[0] in self._MEMINFO_FIELDS:
+        meminfo[parts[0]] = int(parts[1]) * 1024
+    return meminfo
+
   def snapshot(self):
-    assert self._csv_writer
+    assert self._output_file_object is not None
     # Get process memory info
-    p = psutil.Process()
-    mem = p.memory_info()
-
-    # Get system memory mem
-    vm = psutil.virtual_memory()
+    mem = self._process.memory_info()
+
+    # Get system memory info
+    meminfo = self._read_meminfo()
+    vm_total = meminfo[b'MemTotal:']
+    vm_free = meminfo[b'MemFree:']
+    vm_buffers = meminfo.get(b'Buffers:', 0)
+    # Same as `free`, which counts reclaimable slab memory as cache.
+    vm_cached = meminfo.get(b'Cached:', 0) + meminfo.get(b'SReclaimable:', 0)
+    vm_used = vm_total - vm_free - vm_cached - vm_buffers
+    if vm_used < 0:
+      vm_used = vm_total - vm_free
+    vm_available = meminfo.get(b'MemAvailable:', 0)
+    if not vm_available:
+      # Kernels before 3.14 lack `MemAvailable:`; psutil estimates it.
+      vm_available = psutil.virtual_memory().available
+    if vm_available > vm_total:
+      vm_available = vm_free
+    vm_percent = round(100.0 * (vm_total - vm_available) / vm_total, 1)
 
     # Store latest snapshots
-    self._vm_total = vm.total
-    self._vm_available = vm.available
+    self._vm_total = vm_total
+    self._vm_available = vm_available
 
     timestamp = time.time()
     self._snapshot_count += 1
     self._throughput = self._snapshot_count / (timestamp - self._start_time)
-    self._csv_writer.writerow([
-        mem.rss,
-        mem.vms,
-        mem.shared,
-        mem.text,
-        mem.lib,
-        mem.data,
-        mem.dirty,
-        self._vm_total,
-        self._vm_available,
-        vm.percent,
-        vm.used,
-        vm.free,
-        vm.active,
-        vm.inactive,
-        vm.buffers,
-        vm.cached,
-        vm.shared,
-        vm.slab,
-        timestamp,
-        self._throughput,
-    ])
+    # All columns are numeric, so a fixed template is valid CSV without the
+    # quoting logic of `csv.writer`.
+    self._output_file_object.write(
+        f'{mem.rss},{mem.vms},{mem.shared},{mem.text},{mem.lib},{mem.data},'
+        f'{mem.dirty},{self._vm_total},{self._vm_available},{vm_percent},'
+        f'{vm_used},{vm_free},{meminfo.get(b"Active:", 0)},'
+        f'{meminfo.get(b"Inactive:", 0)},{vm_buffers},{vm_cached},'
+        f'{meminfo.get(b"Shmem:", 0)},{meminfo.get(b"Slab:", 0)},{timestamp},'
+        f'{self._throughput}\n'.encode())
 
   @property
   def vm_total(self):
@@ -278,24 +451,38 @@ class MemoryLogger(BaseLogger):
       PsUtilLogger,
   ]
 
-  def __init__(self, output_dir: str, label: Optional[str] = None):
+  def __init__(self,
+               output_dir: str,
+               label: Optional[str] = None,
+               timestring: Optional[str] = None):
     """Initialize."""
-    self._loggers: Dict[str, BaseLogger] = {}
-    for c in self.SUPPORTED_LOGGERS:
-        self._loggers[c.__name__] = c(output_dir, label)
+    # Share one time string so all log files from a run have the same suffix.
+    if timestring is None:
+      timestring = _get_timestring()
+    self._loggers: Tuple[BaseLogger, ...] = tuple(
+        c(output_dir, label, timestring) for c in self.SUPPORTED_LOGGERS)
+    self._pool = None
 
   def snapshot(self) -> None:
-    """Takes a snapshot of memory allocation."""
-    for name in self._loggers:
-      self._loggers[name].snapshot()
+    """Takes a snapshot of memory allocation.
+
+    Sub-logger snapshots are mostly `/proc` reads and file writes, so they
+    run concurrently on a thread pool.
+    """
+    assert self._pool is not None
+    list(self._pool.map(lambda logger: logger.snapshot(), self._loggers))
 
   def __enter__(self):
     """Context manager `__enter__` method."""
-    for name in self._loggers:
-      self._loggers[name].__enter__()
+    for logger in self._loggers:
+      logger.__enter__()
+    self._pool = futures.ThreadPoolExecutor(max_workers=len(self._loggers))
+    return self
 
   def __exit__(self, exc_type, exc_value, exc_tb):
     """Context manager `__exit__` method."""
-    for name in self._loggers:
-      self._loggers[name].__exit__()
-
+    if self._pool is not None:
+      self._pool.shutdown()
+      self._pool = None
+    for logger in self._loggers:
+      logger.__exit__(exc_type, exc_value, exc_tb)
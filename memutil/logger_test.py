@@ -16,9 +16,15 @@
 
 import csv
 import json
+import pathlib
+import re
 import unittest
 import tempfile
 
+import psutil
+
+from memutil import _jit
+from memutil import data_types
 from memutil import logger
 
 
@@ -33,6 +39,52 @@ class BuddyInfoLoggerTest(unittest.TestCase):
     data = logger_.read_buddy_info()
     self.assertGreater(len(data.numa_nodes), 0)
 
+  def test_parse_line(self):
+    line = (b'Node 0, zone   Normal   1497    117      5      3      0      1'
+            b'      2      2      2      1     43 ')
+    numa_node, zone_type, nr_free = logger.BuddyInfoLogger._parse_line(line)
+    self.assertEqual(0, numa_node)
+    self.assertEqual('Normal', zone_type)
+    self.assertEqual([1497, 117, 5, 3, 0, 1, 2, 2, 2, 1, 43], nr_free)
+
+  def test_split_buffer(self):
+    buf = (b'Node 0, zone      DMA      0      0      0      1      3\n'
+           b'Node 0, zone   Normal   1497    117      5      3      0\n'
+           b'Node 12, zone   Normal     43      2      1\n')
+    table = logger.BuddyInfoLogger._split_buffer(buf, timestamp=1)
+    self.assertEqual([0, 0, 12], table.node_index.tolist())
+    self.assertEqual(['DMA', 'Normal', 'Normal'], table.zone_type)
+    self.assertEqual([5, 5, 3], table.num_orders.tolist())
+    self.assertEqual([[0, 0, 0, 1, 3], [1497, 117, 5, 3, 0], [43, 2, 1, 0, 0]],
+                     table.free_fragments.tolist())
+
+  @unittest.skipUnless(_jit.AVAILABLE, 'numba is not installed')
+  def test_scan_buffer_matches_split_buffer(self):
+    buf = (b'Node 0, zone      DMA      0      0      0      1      3\n'
+           b'Node 0, zone   Normal   1497    117      5      3      0\n'
+           b'Node 12, zone   Normal     43      2      1\n')
+    expected = logger.BuddyInfoLogger._split_buffer(buf, timestamp=1)
+    output = logger.BuddyInfoLogger._scan_buffer(buf, timestamp=1)
+    self.assertEqual(expected.to_dict(), output.to_dict())
+    self.assertEqual(expected.num_orders.tolist(), output.num_orders.tolist())
+    self.assertEqual(expected.free_fragments.tolist(),
+                     output.free_fragments.tolist())
+
+  def test_split_buffer_rejects_out_of_range(self):
+    for buf in [b'Node 0, zone   Normal 4294967301 2\n',
+                b'Node 0, zone   Normal -1 2\n']:
+      with self.assertRaisesRegex(
+          ValueError, re.escape(data_types._FREE_FRAGMENTS_ERROR)):
+        logger.BuddyInfoLogger._split_buffer(buf, timestamp=1)
+
+  @unittest.skipUnless(_jit.AVAILABLE, 'numba is not installed')
+  def test_scan_buffer_rejects_out_of_range(self):
+    for buf in [b'Node 0, zone   Normal 4294967301 2\n',
+                b'Node 0, zone   Normal -1 2\n']:
+      with self.assertRaisesRegex(
+          ValueError, re.escape(data_types._FREE_FRAGMENTS_ERROR)):
+        logger.BuddyInfoLogger._scan_buffer(buf, timestamp=1)
+
   def test_snapshot(self):
     with tempfile.TemporaryDirectory() as output_dir:
       with logger.BuddyInfoLogger(output_dir, self._label) as logger_:
@@ -46,6 +98,17 @@ class BuddyInfoLoggerTest(unittest.TestCase):
 
       self.assertEqual(len(json_objects), 1)
 
+  def test_read_buddy_info_repeated(self):
+    with tempfile.TemporaryDirectory() as output_dir:
+      with logger.BuddyInfoLogger(output_dir, self._label) as logger_:
+        first = logger_.read_buddy_info()
+        second = logger_.read_buddy_info()
+
+    self.assertGreater(len(first.numa_nodes), 0)
+    self.assertEqual(
+        [[z.zone_type for z in n.zones] for n in first.numa_nodes],
+        [[z.zone_type for z in n.zones] for n in second.numa_nodes])
+
 
 class PsUtilLoggerTest(unittest.TestCase):
   """Tests for `PsUtilLogger` class."""
@@ -66,11 +129,74 @@ class PsUtilLoggerTest(unittest.TestCase):
         self.assertCountEqual(logger.PsUtilLogger._CSV_HEADER, header)
         rows = [row for row in reader]
         self.assertEqual(1, len(rows))
+        self.assertEqual(len(header), len(rows[0]))
+        for value in rows[0]:
+          float(value)
+
+  def test_vm_columns_match_psutil(self):
+    with tempfile.TemporaryDirectory() as output_dir:
+      with logger.PsUtilLogger(output_dir, label=self._label) as logger_:
+        logger_.snapshot()
+        vm = psutil.virtual_memory()
+        output_path = logger_.output_path
+
+      with open(output_path) as fp:
+        row = next(csv.DictReader(fp))
+
+    self.assertEqual(vm.total, int(row['vm_total']))
+    # Other fields move between the two reads, so allow some slack.
+    delta = vm.total // 100
+    for field in ['available', 'used', 'free', 'active', 'inactive',
+                  'buffers', 'cached', 'shared', 'slab']:
+      self.assertAlmostEqual(getattr(vm, field), int(row[f'vm_{field}']),
+                             delta=delta, msg=field)
+    self.assertAlmostEqual(vm.percent, float(row['vm_percent']), delta=1.0)
+
+  def test_meminfo_missing_optional_fields(self):
+    with tempfile.TemporaryDirectory() as output_dir:
+      meminfo_path = pathlib.Path(output_dir) / 'meminfo'
+      meminfo_path.write_text('MemTotal: 1000 kB\n'
+                              'MemFree: 400 kB\n'
+                              'Buffers: 100 kB\n'
+                              'Cached: 200 kB\n'
+                              'Active: 300 kB\n'
+                              'Inactive: 250 kB\n')
+      logger_ = logger.PsUtilLogger(output_dir, label=self._label)
+      logger_._MEMINFO_PSEUDO_FILE = str(meminfo_path)
+      with logger_:
+        logger_.snapshot()
+
+      with open(logger_.output_path) as fp:
+        row = next(csv.DictReader(fp))
+
+    self.assertEqual(1000 * 1024, int(row['vm_total']))
+    self.assertEqual(300 * 1024, int(row['vm_used']))
+    self.assertEqual(0, int(row['vm_shared']))
+    self.assertEqual(0, int(row['vm_slab']))
 
   def test_output_filename_ok(self):
     logger_ = logger.PsUtilLogger('dir', label='label')
     self.assertIn(logger_._OUTPUT_PREFIX, str(logger_.output_path))
 
 
+class MemoryLoggerTest(unittest.TestCase):
+  """Tests for `MemoryLogger` class."""
+
+  def test_snapshot(self):
+    with tempfile.TemporaryDirectory() as output_dir:
+      with logger.MemoryLogger(output_dir, 'test-memory-logger') as logger_:
+        logger_.snapshot()
+
+      output_paths = list(pathlib.Path(output_dir).iterdir())
+      self.assertEqual(2, len(output_paths))
+
+  def test_output_filenames_share_timestring(self):
+    logger_ = logger.MemoryLogger('dir', label='label',
+                                  timestring='2023-01-02-03-04-05')
+    for sub_logger in logger_._loggers:
+      self.assertTrue(
+          sub_logger.output_path.stem.endswith('-label-2023-01-02-03-04-05'))
+
+
 if __name__ == '__main__':
   unittest.main()
@@ -22,8 +22,13 @@ setup(
     author='Carlos Ezequiel',
     author_email='cezequiel@google.com',
     packages=find_packages(include=['memutil']),
+    python_requires='>=3.10',
     install_requires=[
-        'dataclasses-json==0.6.1',
+        'numpy==1.26.2',
+        'orjson==3.9.10',
         'psutil==5.9.5',
     ],
+    extras_require={
+        'numba': ['numba==0.58.1'],
+    },
 )